@@ -5,24 +5,87 @@ Cross-platform SMB diagnostic and mapping utility for Windows, macOS, and Linux
 """
 
 import os
+import re
 import sys
+import importlib.util
+import ctypes
 import platform
+import time
+import asyncio
 import subprocess
 import socket
 import getpass
 import base64
+import hashlib
 from cryptography.fernet import Fernet
-from cryptography.hazmat.primitives import hashes
-from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
-import json
+import atexit
+import functools
 import tempfile
 import shutil
 
+
+# Drive-letter labels, indexed by bit position in the GetLogicalDrives mask
+_ALL_DRIVES = tuple(f"{chr(c)}:" for c in range(ord('A'), ord('Z') + 1))
+
+# Share rows in net view / smbclient -L listings: name column (which
+# may contain spaces) followed by a Disk or IPC type column. Compiled
+# once, matched against raw bytes.
+_SHARE_RE = re.compile(rb'^\s*(?P<name>\S(?:.*?\S)?)\s{2,}(?P<type>Disk|IPC)\b')
+
+
+# Short-TTL DNS cache keyed on (host, port) so interactive retries
+# don't re-pay resolution; lookup failures are cached briefly too so
+# retrying a typo'd hostname fails instantly instead of waiting on
+# the resolver again.
+_DNS_TTL = 30.0
+_DNS_NEGATIVE_TTL = 5.0
+_dns_cache = {}
+
+
+async def _resolve(host, port):
+    """Resolve host:port for a stream socket, with a short-lived cache"""
+    key = (host, port)
+    cached = _dns_cache.get(key)
+    if cached is not None:
+        deadline, value = cached
+        if time.monotonic() < deadline:
+            if isinstance(value, Exception):
+                raise value
+            return value
+
+    loop = asyncio.get_running_loop()
+    try:
+        addr_infos = await loop.getaddrinfo(host, port, type=socket.SOCK_STREAM)
+    except socket.gaierror as e:
+        _dns_cache[key] = (time.monotonic() + _DNS_NEGATIVE_TTL, e)
+        raise
+    _dns_cache[key] = (time.monotonic() + _DNS_TTL, addr_infos)
+    return addr_infos
+
+
+@functools.lru_cache(maxsize=8)
+def _derive_fernet(password):
+    """Derive a Fernet cipher from a password.
+
+    Key derivation is the dominant CPU cost of the crypto path, so
+    cache the result per password (in-process only). Call
+    _derive_fernet.cache_clear() to drop derived keys when done.
+    """
+    salt = b'smb_tool_salt_2024'  # In production, use a random salt
+    derived = hashlib.scrypt(
+        password.encode(), salt=salt, n=2**14, r=8, p=1, dklen=32
+    )
+    key = base64.urlsafe_b64encode(derived)
+    return Fernet(key)
+
+
 class SMBDiagnosticTool:
     def __init__(self):
         self.os_type = platform.system().lower()
         self.results = {}
         self.encryption_key = None
+        self._cipher = None
+        self._cred_files = {}
         
     def print_header(self):
         """Print tool header with system information"""
@@ -35,130 +98,245 @@ class SMBDiagnosticTool:
         print("=" * 60)
         print()
 
-    def check_dependencies(self):
+    async def _run_command(self, argv, timeout=10):
+        """Run a command without blocking the event loop"""
+        proc = await asyncio.create_subprocess_exec(
+            *argv,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE
+        )
+        try:
+            stdout, stderr = await asyncio.wait_for(proc.communicate(), timeout)
+        except asyncio.TimeoutError:
+            proc.kill()
+            await proc.wait()
+            raise
+        return proc.returncode, stdout.decode(errors='replace'), stderr.decode(errors='replace')
+
+    async def _stream_command(self, argv, handle_line, timeout=10):
+        """Run a command, feeding raw stdout lines to handle_line.
+
+        Parsing overlaps child execution instead of buffering the whole
+        output. Lines are passed as bytes so callers that only scan for
+        markers never pay for a decode. handle_line may return True to
+        stop early, in which case the child is terminated. Returns
+        (returncode, stderr_text).
+        """
+        proc = await asyncio.create_subprocess_exec(
+            *argv,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE
+        )
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        # Drain stderr from the start so a child that fills the stderr
+        # pipe buffer mid-run can't deadlock against our stdout reads
+        stderr_task = asyncio.ensure_future(proc.stderr.read())
+        stopped_early = False
+        try:
+            while True:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    raise asyncio.TimeoutError
+                line = await asyncio.wait_for(proc.stdout.readline(), remaining)
+                if not line:
+                    break
+                if handle_line(line):
+                    stopped_early = True
+                    proc.terminate()
+                    break
+            if stopped_early:
+                # The caller already has what it needs; don't wait on
+                # stderr EOF from a terminated child, and give it one
+                # second to exit rather than the rest of the deadline
+                stderr_task.cancel()
+                stderr = b''
+                returncode = await self._reap(proc, 1)
+            else:
+                stderr = await asyncio.wait_for(
+                    stderr_task, max(deadline - loop.time(), 1)
+                )
+                returncode = await self._reap(proc, max(deadline - loop.time(), 1))
+        except asyncio.TimeoutError:
+            stderr_task.cancel()
+            try:
+                proc.kill()
+            except ProcessLookupError:
+                pass
+            await self._reap(proc, 1)
+            raise
+        return returncode, stderr.decode(errors='replace')
+
+    async def _reap(self, proc, timeout):
+        """Wait for a child to exit, escalating rather than stalling.
+
+        Process.wait() only completes once the pipes hit EOF, which a
+        child that ignores SIGTERM — or an orphaned descendant that
+        inherited the pipes — can postpone indefinitely. Escalate to
+        SIGKILL after the timeout, and give up on the wait entirely
+        instead of blocking past a second grace period.
+        """
+        try:
+            return await asyncio.wait_for(proc.wait(), timeout)
+        except asyncio.TimeoutError:
+            alive = True
+            try:
+                proc.kill()
+            except ProcessLookupError:
+                alive = False
+            if alive:
+                try:
+                    return await asyncio.wait_for(proc.wait(), 1)
+                except asyncio.TimeoutError:
+                    pass
+            # The process is gone (or unkillable); only pipes inherited
+            # by a descendant can still be holding the transport open.
+            # Close our ends rather than wait on an EOF that never comes.
+            proc._transport.close()
+            return proc.returncode if proc.returncode is not None else -1
+
+    async def check_dependencies(self):
         """Check if required dependencies are available"""
         print("🔍 Checking dependencies...")
         dependencies = {
             'cryptography': False,
             'smbclient': False  # For advanced SMB operations
         }
-        
-        try:
-            import cryptography
-            dependencies['cryptography'] = True
+
+        # A spec lookup answers "is it installed?" without running any
+        # import machinery (the module is already loaded for Fernet anyway)
+        dependencies['cryptography'] = importlib.util.find_spec('cryptography') is not None
+
+        smb_tools = await self.check_smb_tools()
+
+        if dependencies['cryptography']:
             print("✅ Cryptography library: Available")
-        except ImportError:
+        else:
             print("❌ Cryptography library: Missing")
             print("   Install with: pip install cryptography")
-            
-        # Check for system SMB tools
-        smb_tools = self.check_smb_tools()
+
         print(f"{'✅' if smb_tools else '❌'} SMB system tools: {'Available' if smb_tools else 'Missing'}")
-        
+
         return dependencies['cryptography'] and smb_tools
 
-    def check_smb_tools(self):
+    async def check_smb_tools(self):
         """Check for platform-specific SMB tools"""
         if self.os_type == 'windows':
-            return self.check_windows_smb()
+            return await self.check_windows_smb()
         elif self.os_type == 'darwin':  # macOS
-            return self.check_macos_smb()
+            return await self.check_macos_smb()
         elif self.os_type == 'linux':
-            return self.check_linux_smb()
+            return await self.check_linux_smb()
         return False
 
-    def check_windows_smb(self):
+    async def check_windows_smb(self):
         """Check Windows SMB services and features"""
         print("\n🔍 Checking Windows SMB configuration...")
-        
+
         # Check SMB services
         services_to_check = [
             'LanmanServer',     # Server service
             'LanmanWorkstation' # Workstation service
         ]
-        
-        service_status = {}
-        for service in services_to_check:
+
+        async def query_service(service):
+            # Error handling stays inside the task so one failure
+            # doesn't affect the other probes
             try:
-                result = subprocess.run(
-                    ['sc', 'query', service],
-                    capture_output=True,
-                    text=True,
-                    timeout=10
+                running = False
+
+                def scan(line):
+                    nonlocal running
+                    # The state line is all we need; stop reading once seen
+                    running = b'RUNNING' in line
+                    return running
+
+                returncode, _ = await self._stream_command(
+                    ['sc', 'query', service], scan
                 )
-                if result.returncode == 0:
-                    if 'RUNNING' in result.stdout:
-                        service_status[service] = 'Running'
-                        print(f"✅ {service}: Running")
-                    else:
-                        service_status[service] = 'Stopped'
-                        print(f"❌ {service}: Stopped")
-                        print(f"   To start: sc start {service}")
-                else:
-                    service_status[service] = 'Not found'
-                    print(f"❌ {service}: Not found")
+                if running:
+                    return 'Running'
+                if returncode == 0:
+                    return 'Stopped'
+                return 'Not found'
             except Exception as e:
-                service_status[service] = f'Error: {str(e)}'
-                print(f"❌ {service}: Error checking - {str(e)}")
+                return f'Error: {str(e)}'
+
+        # Fan the service queries out so total time is the slowest probe,
+        # not the sum of all of them
+        statuses = await asyncio.gather(*(query_service(s) for s in services_to_check))
+        service_status = dict(zip(services_to_check, statuses))
+
+        for service in services_to_check:
+            status = service_status[service]
+            if status == 'Running':
+                print(f"✅ {service}: Running")
+            elif status == 'Stopped':
+                print(f"❌ {service}: Stopped")
+                print(f"   To start: sc start {service}")
+            elif status == 'Not found':
+                print(f"❌ {service}: Not found")
+            else:
+                print(f"❌ {service}: Error checking - {status[len('Error: '):]}")
         
         # Check SMB features
-        self.check_windows_features()
-        
+        await self.check_windows_features()
+
         self.results['windows_services'] = service_status
         return any(status == 'Running' for status in service_status.values())
 
-    def check_windows_features(self):
+    async def check_windows_features(self):
         """Check Windows SMB features"""
         print("\n🔍 Checking Windows SMB features...")
-        
+
         features_to_check = [
             'SMB1Protocol',
             'SMB1Protocol-Client',
             'SMB1Protocol-Server'
         ]
-        
+
         try:
-            result = subprocess.run(
+            header_printed = False
+
+            def print_feature_line(line):
+                # Write rows straight through as bytes — the table is
+                # only displayed, so decoding it would be a wasted copy
+                nonlocal header_printed
+                if not header_printed:
+                    print("📋 SMB Features status:")
+                    header_printed = True
+                sys.stdout.flush()
+                sys.stdout.buffer.write(line)
+
+            returncode, _ = await self._stream_command(
                 ['powershell', '-Command', 'Get-WindowsOptionalFeature -Online | Where-Object {$_.FeatureName -like "*SMB*"} | Select-Object FeatureName, State'],
-                capture_output=True,
-                text=True,
+                print_feature_line,
                 timeout=15
             )
-            
-            if result.returncode == 0:
-                print("📋 SMB Features status:")
-                print(result.stdout)
-            else:
+
+            if returncode != 0:
                 print("⚠️  Could not check SMB features (requires admin privileges)")
-                
+
         except Exception as e:
             print(f"⚠️  Error checking SMB features: {str(e)}")
 
-    def check_macos_smb(self):
+    async def check_macos_smb(self):
         """Check macOS SMB configuration"""
         print("\n🔍 Checking macOS SMB configuration...")
-        
-        # Check if SMB is available
-        try:
-            result = subprocess.run(['which', 'smbutil'], capture_output=True, text=True)
-            if result.returncode == 0:
-                print("✅ smbutil: Available")
-                smb_available = True
-            else:
-                print("❌ smbutil: Not found")
-                smb_available = False
-        except Exception as e:
-            print(f"❌ Error checking smbutil: {str(e)}")
-            smb_available = False
-            
+
+        # A $PATH walk in-process beats forking `which`
+        smb_available = shutil.which('smbutil') is not None
+        if smb_available:
+            print("✅ smbutil: Available")
+        else:
+            print("❌ smbutil: Not found")
+
         # Check SMB client service
         try:
-            result = subprocess.run(
-                ['launchctl', 'list', 'com.apple.smb.preferences'],
-                capture_output=True,
-                text=True
+            returncode, _, _ = await self._run_command(
+                ['launchctl', 'list', 'com.apple.smb.preferences']
             )
-            if result.returncode == 0:
+            if returncode == 0:
                 print("✅ SMB client service: Running")
             else:
                 print("⚠️  SMB client service: Status unknown")
@@ -168,24 +346,21 @@ class SMBDiagnosticTool:
         self.results['macos_smb'] = {'smbutil_available': smb_available}
         return smb_available
 
-    def check_linux_smb(self):
+    async def check_linux_smb(self):
         """Check Linux SMB configuration"""
         print("\n🔍 Checking Linux SMB configuration...")
-        
-        # Check for CIFS utilities
+
+        # Check for CIFS utilities. shutil.which walks $PATH in-process,
+        # so no subprocess forks are needed here at all
         tools = ['smbclient', 'mount.cifs', 'smbmount']
+
         available_tools = []
-        
         for tool in tools:
-            try:
-                result = subprocess.run(['which', tool], capture_output=True, text=True)
-                if result.returncode == 0:
-                    print(f"✅ {tool}: Available")
-                    available_tools.append(tool)
-                else:
-                    print(f"❌ {tool}: Not found")
-            except Exception as e:
-                print(f"❌ {tool}: Error checking - {str(e)}")
+            if shutil.which(tool):
+                print(f"✅ {tool}: Available")
+                available_tools.append(tool)
+            else:
+                print(f"❌ {tool}: Not found")
         
         if not available_tools:
             print("\n💡 To install SMB tools:")
@@ -196,164 +371,214 @@ class SMBDiagnosticTool:
         self.results['linux_smb'] = {'available_tools': available_tools}
         return len(available_tools) > 0
 
-    def test_network_connectivity(self, host, port=445):
+    async def test_network_connectivity(self, host, port=445):
         """Test network connectivity to SMB port"""
         print(f"\n🔍 Testing network connectivity to {host}:{port}...")
-        
+
         try:
-            sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-            sock.settimeout(5)
-            result = sock.connect_ex((host, port))
-            sock.close()
-            
-            if result == 0:
-                print(f"✅ Port {port}: Open")
-                return True
-            else:
-                print(f"❌ Port {port}: Closed or unreachable")
-                return False
+            addr_infos = await _resolve(host, port)
         except socket.gaierror as e:
             print(f"❌ DNS resolution failed: {str(e)}")
             return False
+
+        # Race a connect against every cached address (IPv4 and IPv6)
+        # so a single blackholed family can't eat the whole budget;
+        # the first to succeed wins
+        loop = asyncio.get_running_loop()
+        socks = []
+        tasks = []
+        try:
+            for family, socktype, proto, _, sockaddr in addr_infos:
+                sock = socket.socket(family, socktype, proto)
+                sock.setblocking(False)
+                socks.append(sock)
+                tasks.append(asyncio.ensure_future(loop.sock_connect(sock, sockaddr)))
+
+            connected = False
+            deadline = loop.time() + 2.0
+            pending = set(tasks)
+            while pending and not connected:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                done, pending = await asyncio.wait(
+                    pending, timeout=remaining,
+                    return_when=asyncio.FIRST_COMPLETED
+                )
+                connected = any([task.exception() is None for task in done])
+
+            if connected:
+                print(f"✅ Port {port}: Open")
+                return True
+            print(f"❌ Port {port}: Closed or unreachable")
+            return False
         except Exception as e:
             print(f"❌ Connection test failed: {str(e)}")
             return False
+        finally:
+            for task in tasks:
+                task.cancel()
+                if task.done() and not task.cancelled():
+                    task.exception()  # mark any failure as retrieved
+            for sock in socks:
+                sock.close()
+
+    async def _probe_server(self, server):
+        """Run the TCP and SMB probes concurrently.
+
+        The TCP probe gets a 200 ms head start; if it rejects that
+        quickly, the SMB client subprocess is never forked, and if it
+        fails later the SMB probe is cancelled — its result can only
+        be a guaranteed failure. Returns (tcp_ok, smb_ok).
+        """
+        tcp_task = asyncio.create_task(self.test_network_connectivity(server))
+        done, _ = await asyncio.wait({tcp_task}, timeout=0.2)
+        if done and not tcp_task.result():
+            return False, False
+
+        smb_task = asyncio.create_task(self.test_smb_connection(server))
+        if not await tcp_task:
+            smb_task.cancel()
+            try:
+                await smb_task
+            except asyncio.CancelledError:
+                pass
+            return False, False
+
+        return True, await smb_task
 
-    def test_smb_connection(self, server, share=None):
+    async def test_smb_connection(self, server, share=None):
         """Test SMB connection to server"""
         print(f"\n🔍 Testing SMB connection to {server}...")
-        
+
         if self.os_type == 'windows':
-            return self.test_windows_smb_connection(server, share)
+            return await self.test_windows_smb_connection(server, share)
         elif self.os_type == 'darwin':
-            return self.test_macos_smb_connection(server, share)
+            return await self.test_macos_smb_connection(server, share)
         elif self.os_type == 'linux':
-            return self.test_linux_smb_connection(server, share)
-        
+            return await self.test_linux_smb_connection(server, share)
+
         return False
 
-    def test_windows_smb_connection(self, server, share):
+    async def test_windows_smb_connection(self, server, share):
         """Test Windows SMB connection"""
         try:
-            # List shares
-            result = subprocess.run(
-                ['net', 'view', f'\\\\{server}'],
-                capture_output=True,
-                text=True,
-                timeout=10
+            # List shares; scan lines as they arrive so we only keep
+            # the share rows, not the whole listing
+            share_lines = []
+
+            def scan(line):
+                # One compiled-regex match per row; only matched rows
+                # ever get decoded
+                m = _SHARE_RE.match(line)
+                if m and m.group('type') == b'Disk':
+                    share_lines.append(line.decode(errors='replace').strip())
+
+            returncode, stderr = await self._stream_command(
+                ['net', 'view', f'\\\\{server}'], scan
             )
-            
-            if result.returncode == 0:
+
+            if returncode == 0:
                 print(f"✅ SMB connection to {server}: Success")
                 print("📋 Available shares:")
-                lines = result.stdout.split('\n')
-                for line in lines:
-                    if line.strip() and 'Disk' in line:
-                        print(f"   {line.strip()}")
+                for line in share_lines:
+                    print(f"   {line}")
                 return True
             else:
                 print(f"❌ SMB connection to {server}: Failed")
-                if result.stderr:
-                    print(f"   Error: {result.stderr.strip()}")
+                if stderr:
+                    print(f"   Error: {stderr.strip()}")
                 return False
-                
+
         except Exception as e:
             print(f"❌ SMB connection test failed: {str(e)}")
             return False
 
-    def test_macos_smb_connection(self, server, share):
+    async def test_macos_smb_connection(self, server, share):
         """Test macOS SMB connection"""
         try:
-            result = subprocess.run(
-                ['smbutil', 'view', f'//{server}'],
-                capture_output=True,
-                text=True,
-                timeout=10
+            returncode, stdout, stderr = await self._run_command(
+                ['smbutil', 'view', f'//{server}']
             )
-            
-            if result.returncode == 0:
+
+            if returncode == 0:
                 print(f"✅ SMB connection to {server}: Success")
-                if result.stdout:
+                if stdout:
                     print("📋 Available shares:")
-                    print(result.stdout)
+                    print(stdout)
                 return True
             else:
                 print(f"❌ SMB connection to {server}: Failed")
-                if result.stderr:
-                    print(f"   Error: {result.stderr.strip()}")
+                if stderr:
+                    print(f"   Error: {stderr.strip()}")
                 return False
-                
+
         except Exception as e:
             print(f"❌ SMB connection test failed: {str(e)}")
             return False
 
-    def test_linux_smb_connection(self, server, share):
+    async def test_linux_smb_connection(self, server, share):
         """Test Linux SMB connection"""
         try:
-            result = subprocess.run(
-                ['smbclient', '-L', server, '-N'],
-                capture_output=True,
-                text=True,
-                timeout=10
+            # Scan the listing as it streams in, keeping only share rows
+            share_lines = []
+
+            def scan(line):
+                if _SHARE_RE.match(line):
+                    share_lines.append(line.decode(errors='replace').strip())
+
+            returncode, stderr = await self._stream_command(
+                ['smbclient', '-L', server, '-N'], scan
             )
-            
-            if result.returncode == 0:
+
+            if returncode == 0:
                 print(f"✅ SMB connection to {server}: Success")
                 print("📋 Available shares:")
-                lines = result.stdout.split('\n')
-                for line in lines:
-                    if 'Disk' in line or 'IPC' in line:
-                        print(f"   {line.strip()}")
+                for line in share_lines:
+                    print(f"   {line}")
                 return True
             else:
                 print(f"❌ SMB connection to {server}: Failed")
-                if result.stderr:
-                    print(f"   Error: {result.stderr.strip()}")
+                if stderr:
+                    print(f"   Error: {stderr.strip()}")
                 return False
-                
+
         except Exception as e:
             print(f"❌ SMB connection test failed: {str(e)}")
             return False
 
     def generate_encryption_key(self, password):
         """Generate encryption key from password"""
-        password_bytes = password.encode()
-        salt = b'smb_tool_salt_2024'  # In production, use a random salt
-        kdf = PBKDF2HMAC(
-            algorithm=hashes.SHA256(),
-            length=32,
-            salt=salt,
-            iterations=100000,
-        )
-        key = base64.urlsafe_b64encode(kdf.derive(password_bytes))
-        return Fernet(key)
+        return _derive_fernet(password)
 
-    def encrypt_credentials(self, username, password, encryption_password):
+    def encrypt_credentials(self, username, password, encryption_password, cipher=None):
         """Encrypt user credentials"""
         try:
-            cipher = self.generate_encryption_key(encryption_password)
-            credentials = {
-                'username': username,
-                'password': password
-            }
-            
-            credentials_json = json.dumps(credentials)
-            encrypted_data = cipher.encrypt(credentials_json.encode())
-            
-            return base64.urlsafe_b64encode(encrypted_data).decode()
+            if cipher is None:
+                cipher = self.generate_encryption_key(encryption_password)
+
+            # Length-prefixed framing: 2-byte username length, then the
+            # username and password bytes. Fernet tokens are already
+            # urlsafe base64, so no further wrapping is needed
+            username_bytes = username.encode()
+            payload = len(username_bytes).to_bytes(2, 'big') + username_bytes + password.encode()
+
+            return cipher.encrypt(payload).decode('ascii')
         except Exception as e:
             print(f"❌ Error encrypting credentials: {str(e)}")
             return None
 
-    def decrypt_credentials(self, encrypted_data, encryption_password):
+    def decrypt_credentials(self, encrypted_data, encryption_password, cipher=None):
         """Decrypt user credentials"""
         try:
-            cipher = self.generate_encryption_key(encryption_password)
-            encrypted_bytes = base64.urlsafe_b64decode(encrypted_data.encode())
-            decrypted_data = cipher.decrypt(encrypted_bytes)
-            
-            credentials = json.loads(decrypted_data.decode())
-            return credentials['username'], credentials['password']
+            if cipher is None:
+                cipher = self.generate_encryption_key(encryption_password)
+            payload = cipher.decrypt(encrypted_data.encode('ascii'))
+
+            username_len = int.from_bytes(payload[:2], 'big')
+            username = payload[2:2 + username_len].decode()
+            password = payload[2 + username_len:].decode()
+            return username, password
         except Exception as e:
             print(f"❌ Error decrypting credentials: {str(e)}")
             return None, None
@@ -374,18 +599,19 @@ class SMBDiagnosticTool:
     def mount_windows_smb(self, server, share, username, password):
         """Mount SMB share on Windows"""
         try:
-            # Find available drive letter
-            used_drives = [f"{chr(i)}:" for i in range(ord('A'), ord('Z')+1) 
-                          if os.path.exists(f"{chr(i)}:\\")]
-            
-            available_drives = [f"{chr(i)}:" for i in range(ord('Z'), ord('A')-1, -1) 
-                               if f"{chr(i)}:" not in used_drives]
-            
-            if not available_drives:
+            # Find available drive letter. GetLogicalDrives returns a
+            # 26-bit mask of letters in use in a single syscall, instead
+            # of stat'ing every letter (which can hang on removable media)
+            used_mask = ctypes.windll.kernel32.GetLogicalDrives()
+
+            # Highest set bit of the free mask is the first free letter
+            # from Z: downwards — no per-letter loop needed
+            free_mask = ~used_mask & 0x03FFFFFF
+            if not free_mask:
                 print("❌ No available drive letters")
                 return False
-                
-            drive_letter = available_drives[0]
+
+            drive_letter = _ALL_DRIVES[free_mask.bit_length() - 1]
             unc_path = f"\\\\{server}\\{share}"
             
             # Create net use command
@@ -452,64 +678,94 @@ class SMBDiagnosticTool:
             print(f"❌ Error mounting SMB share: {str(e)}")
             return False
 
+    def _get_cred_file(self, server, username, password):
+        """Return a credentials file for this server/user.
+
+        The file is created once per (server, username) and reused for
+        later mounts in the same session, instead of a fresh tempfile
+        per call. If the password changes — a retry after a failed
+        mount — the cached file is rewritten in place. All cached
+        files are removed at interpreter exit.
+        """
+        key = (server, username)
+        content = f"username={username}\npassword={password}\n"
+        cached = self._cred_files.get(key)
+        if cached is not None:
+            path, cached_content = cached
+            if cached_content != content:
+                with open(path, 'w') as f:
+                    f.write(content)
+                self._cred_files[key] = (path, content)
+            return path
+
+        # mkstemp creates the file 0600 with O_EXCL semantics
+        fd, path = tempfile.mkstemp(suffix='.cred')
+        try:
+            with os.fdopen(fd, 'w') as f:
+                f.write(content)
+        except Exception:
+            os.unlink(path)
+            raise
+
+        if not self._cred_files:
+            atexit.register(self._cleanup_cred_files)
+        self._cred_files[key] = (path, content)
+        return path
+
+    def _cleanup_cred_files(self):
+        """Remove all cached credentials files"""
+        for path, _ in self._cred_files.values():
+            try:
+                os.unlink(path)
+            except OSError:
+                pass
+        self._cred_files.clear()
+
     def mount_linux_smb(self, server, share, username, password, mount_point):
         """Mount SMB share on Linux"""
         try:
             if not mount_point:
                 mount_point = f"/mnt/{share}"
-                
+
             # Create mount point if it doesn't exist
             os.makedirs(mount_point, exist_ok=True)
-            
-            # Create credentials file temporarily
-            cred_content = f"username={username}\npassword={password}\n"
-            
-            with tempfile.NamedTemporaryFile(mode='w', delete=False, suffix='.cred') as f:
-                f.write(cred_content)
-                cred_file = f.name
-            
-            try:
-                # Mount command
-                cmd = [
-                    'sudo', 'mount', '-t', 'cifs',
-                    f'//{server}/{share}',
-                    mount_point,
-                    '-o', f'credentials={cred_file},uid={os.getuid()},gid={os.getgid()}'
-                ]
-                
-                result = subprocess.run(cmd, capture_output=True, text=True, timeout=15)
-                
-                if result.returncode == 0:
-                    print(f"✅ Successfully mounted {server}/{share} to {mount_point}")
-                    return True
-                else:
-                    print(f"❌ Failed to mount share: {result.stderr.strip()}")
-                    return False
-                    
-            finally:
-                # Clean up credentials file
-                try:
-                    os.unlink(cred_file)
-                except:
-                    pass
-                    
+
+            cred_file = self._get_cred_file(server, username, password)
+
+            # Mount command
+            cmd = [
+                'sudo', 'mount', '-t', 'cifs',
+                f'//{server}/{share}',
+                mount_point,
+                '-o', f'credentials={cred_file},uid={os.getuid()},gid={os.getgid()}'
+            ]
+
+            result = subprocess.run(cmd, capture_output=True, text=True, timeout=15)
+
+            if result.returncode == 0:
+                print(f"✅ Successfully mounted {server}/{share} to {mount_point}")
+                return True
+            else:
+                print(f"❌ Failed to mount share: {result.stderr.strip()}")
+                return False
+
         except Exception as e:
             print(f"❌ Error mounting SMB share: {str(e)}")
             return False
 
-    def run_diagnostics(self):
+    async def run_diagnostics(self):
         """Run comprehensive SMB diagnostics"""
         self.print_header()
-        
+
         print("🚀 Starting SMB diagnostics...\n")
-        
+
         # Check dependencies
-        if not self.check_dependencies():
+        if not await self.check_dependencies():
             print("\n❌ Critical dependencies missing. Please install required components.")
             return False
-        
+
         # Check SMB services/tools
-        smb_ready = self.check_smb_tools()
+        smb_ready = await self.check_smb_tools()
         
         if not smb_ready:
             print("\n❌ SMB services/tools not properly configured.")
@@ -536,50 +792,65 @@ class SMBDiagnosticTool:
             print("❌ Share name is required.")
             return False
         
-        # Test connectivity first
-        if not self.test_network_connectivity(server):
+        # Probe connectivity and SMB together; total wait is the slower
+        # of the two rather than their sum
+        tcp_ok, smb_ok = asyncio.run(self._probe_server(server))
+        if not tcp_ok:
             print("❌ Cannot reach server. Please check network connectivity.")
             return False
-        
-        # Test SMB connection
-        if not self.test_smb_connection(server):
+
+        if not smb_ok:
             print("⚠️  SMB connection test failed, but attempting to proceed...")
         
-        # Get credentials
-        print("\n🔐 Enter credentials (press Enter for anonymous access):")
-        username = input("Username: ").strip()
-        
-        if username:
-            password = getpass.getpass("Password: ")
-            
-            # Encrypt credentials
-            print("\nFor security, credentials will be encrypted.")
-            encryption_password = getpass.getpass("Enter encryption password: ")
-            
-            encrypted_creds = self.encrypt_credentials(username, password, encryption_password)
-            if encrypted_creds:
-                print("✅ Credentials encrypted successfully.")
-                print(f"Encrypted data: {encrypted_creds[:50]}...")
+        try:
+            # Get credentials
+            print("\n🔐 Enter credentials (press Enter for anonymous access):")
+            username = input("Username: ").strip()
+
+            if username:
+                password = getpass.getpass("Password: ")
+
+                # Encrypt credentials
+                print("\nFor security, credentials will be encrypted.")
+                encryption_password = getpass.getpass("Enter encryption password: ")
+
+                # Derive the cipher once and keep it for the session, so
+                # mapping more shares never rederives the key
+                if self._cipher is None:
+                    self._cipher = _derive_fernet(encryption_password)
+
+                encrypted_creds = self.encrypt_credentials(
+                    username, password, encryption_password, cipher=self._cipher
+                )
+                if encrypted_creds:
+                    print("✅ Credentials encrypted successfully.")
+                    print(f"Encrypted data: {encrypted_creds[:50]}...")
+                else:
+                    print("❌ Failed to encrypt credentials.")
+                    return False
             else:
-                print("❌ Failed to encrypt credentials.")
-                return False
-        else:
-            password = ""
-            encryption_password = ""
-        
-        # Attempt to mount
-        mount_point = None
-        if self.os_type in ['darwin', 'linux']:
-            mount_point = input(f"\nEnter mount point (default: /mnt/{share} or /Volumes/{share}): ").strip()
-        
-        success = self.mount_smb_share(server, share, username, password, mount_point)
-        
-        if success:
-            print(f"\n🎉 Successfully configured SMB access to \\\\{server}\\{share}")
-        else:
-            print(f"\n❌ Failed to configure SMB access to \\\\{server}\\{share}")
-        
-        return success
+                password = ""
+                encryption_password = ""
+
+            # Attempt to mount
+            mount_point = None
+            if self.os_type in ['darwin', 'linux']:
+                mount_point = input(f"\nEnter mount point (default: /mnt/{share} or /Volumes/{share}): ").strip()
+
+            success = self.mount_smb_share(server, share, username, password, mount_point)
+
+            if success:
+                print(f"\n🎉 Successfully configured SMB access to \\\\{server}\\{share}")
+            else:
+                print(f"\n❌ Failed to configure SMB access to \\\\{server}\\{share}")
+
+            return success
+
+        finally:
+            # Drop cached derived keys on every exit path, including
+            # early returns and interrupts
+            self._cipher = None
+            _derive_fernet.cache_clear()
 
 def main():
     """Main function"""
@@ -587,7 +858,7 @@ def main():
         tool = SMBDiagnosticTool()
         
         # Run diagnostics
-        if tool.run_diagnostics():
+        if asyncio.run(tool.run_diagnostics()):
             # If diagnostics pass, offer interactive mapping
             response = input("\nWould you like to map an SMB share now? (y/n): ").strip().lower()
             if response in ['y', 'yes']: